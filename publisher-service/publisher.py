@@ -1,17 +1,27 @@
 import os
-import pika
+import aio_pika
 import json
+import orjson
+import asyncio
+import itertools
 import uuid
 import logging
-import re
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, EmailStr, validator, Field
-from typing import Optional, Dict
+import ahocorasick
+from aio_pika.pool import Pool
+from fastapi import Body, FastAPI, HTTPException
+from pydantic import BaseModel, Field, PrivateAttr
+from typing import Annotated, Optional, Dict, List
 from enum import Enum
 import uvicorn
 
+try:
+    # RE2 gives linear-time matching for the residual classification patterns
+    import re2 as regex_engine
+except ImportError:
+    import re as regex_engine
+
 # Set up logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
 # FastAPI app
@@ -20,6 +30,23 @@ app = FastAPI()
 @app.on_event("startup")
 async def startup_event():
     logger.info("FastAPI application starting up...")
+    app.state.connection_pool = Pool(get_connection, max_size=CONNECTION_POOL_SIZE)
+    app.state.channel_pool = Pool(get_channel, max_size=CHANNEL_POOL_SIZE)
+    app.state.shared_channels = [await get_channel() for _ in range(SHARED_CHANNEL_COUNT)]
+    app.state.shared_channel_index = itertools.count()
+    async with app.state.channel_pool.acquire() as channel:
+        # Declare every (type, priority) queue once, matching the subscriber;
+        # the publish path never declares
+        for queue in _QUEUE_NAMES.values():
+            await channel.declare_queue(queue, durable=True)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info("FastAPI application shutting down...")
+    for channel in app.state.shared_channels:
+        await channel.close()
+    await app.state.channel_pool.close()
+    await app.state.connection_pool.close()
 
 @app.get("/")
 async def root():
@@ -40,59 +67,131 @@ class MessagePriority(str, Enum):
     MEDIUM = "medium"
     LOW = "low"
 
+_PRIORITY_VALUE = {
+    MessagePriority.HIGH: 3,
+    MessagePriority.MEDIUM: 2,
+    MessagePriority.LOW: 1
+}
+
+def get_priority_value(priority: MessagePriority) -> int:
+    return _PRIORITY_VALUE.get(priority, 2)
+
+# Per-(type, priority) routing data, built once since there are only nine combinations
+# queue_name is duplicated in subscriber-service/subscriber.py; keep the two in sync
+def queue_name(msg_type: MessageType, priority: MessagePriority) -> str:
+    return f"{msg_type.value}_{priority.value}_queue"
+
+_QUEUE_NAMES = {
+    (msg_type, priority): queue_name(msg_type, priority)
+    for msg_type in MessageType for priority in MessagePriority
+}
+_TASK_NAMES = {msg_type: f"process_{msg_type.value}_message" for msg_type in MessageType}
+_MESSAGE_PROPERTIES = {
+    priority: {
+        "delivery_mode": aio_pika.DeliveryMode.PERSISTENT,
+        "content_type": "application/json",
+        "content_encoding": "utf-8",
+        "priority": get_priority_value(priority)
+    }
+    for priority in MessagePriority
+}
+
+# Literal indicators per type, matched in a single Aho-Corasick pass
+_LITERAL_INDICATORS = {
+    MessageType.EMAIL: [
+        'subject:', 'subject ', 're:',  # Subject line
+        'dear', 'hi', 'hello',  # Email greetings
+        'find attached', 'please find', 'attached', 'report'  # Email content indicators
+    ],
+    MessageType.WHATSAPP: [
+        'whatsapp:', 'wa:',  # WhatsApp indicators
+        'sent via whatsapp',
+        'message me on'
+    ],
+    MessageType.SMS: [
+        'sms:', 'txt:'  # SMS indicators
+    ]
+}
+
+def _build_automaton(indicators) -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for msg_type, literals in indicators.items():
+        for literal in literals:
+            automaton.add_word(literal, msg_type)
+    automaton.make_automaton()
+    return automaton
+
+_LITERAL_AUTOMATON = _build_automaton(_LITERAL_INDICATORS)
+
+# Email patterns that are not plain literals
+_EMAIL_PATTERNS = [
+    r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}'  # Email address
+]
+
+# WhatsApp patterns that are not plain literals
+_WHATSAPP_PATTERNS = [
+    r'chat.*with.*'
+]
+
+# SMS patterns that are not plain literals; the anchored phone number and
+# OTP checks are plain string tests in Message._classify
+_SMS_PATTERNS = [
+    r'text.*to.*'  # Text message indicators
+]
+
+def _compile_alternation(patterns):
+    # One non-capturing alternation per type so each type is a single scan;
+    # the inline (?i) flag is understood by both RE2 and re
+    return regex_engine.compile("(?i)" + "|".join(f"(?:{p})" for p in patterns))
+
+_EMAIL_RE = _compile_alternation(_EMAIL_PATTERNS)
+_WHATSAPP_RE = _compile_alternation(_WHATSAPP_PATTERNS)
+_SMS_RE = _compile_alternation(_SMS_PATTERNS)
+
 class Message(BaseModel):
     content: str = Field(..., min_length=1, max_length=1000)
     timeout: int = Field(default=30, ge=1, le=300)
     priority: MessagePriority = Field(default=MessagePriority.MEDIUM)
     metadata: Dict = Field(default_factory=dict)
+    _cached_type: Optional[MessageType] = PrivateAttr(default=None)
 
     def determine_type(self) -> MessageType:
-        # Email patterns
-        email_patterns = [
-            r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}',  # Email address
-            r'subject:.*|subject .*|re:.*',  # Subject line
-            r'dear.*|hi.*|hello.*',  # Email greetings
-            r'find attached|please find|attached|report'  # Email content indicators
-        ]
-
-        # WhatsApp patterns
-        whatsapp_patterns = [
-            r'whatsapp:.*|wa:.*',  # WhatsApp indicators
-            r'sent via whatsapp',
-            r'message me on.*',
-            r'chat.*with.*'
-        ]
-
-        # SMS patterns
-        sms_patterns = [
-            r'^\+\d{10,}',  # Phone number at start
-            r'SMS:.*|txt:.*',  # SMS indicators
-            r'^\d{6}$',  # OTP-like numbers
-            r'text.*to.*'  # Text message indicators
-        ]
-
-        content = self.content.lower()
+        if self._cached_type is None:
+            self._cached_type = self._classify()
+        return self._cached_type
 
-        # Check for email patterns
-        for pattern in email_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
+    def _classify(self) -> MessageType:
+        # Single pass over the content for all literal indicators
+        literal_types = set()
+        for _, msg_type in _LITERAL_AUTOMATON.iter(self.content.lower()):
+            if msg_type == MessageType.EMAIL:
                 return MessageType.EMAIL
+            literal_types.add(msg_type)
+
+        # Check for email patterns
+        if _EMAIL_RE.search(self.content):
+            return MessageType.EMAIL
 
         # Check for WhatsApp patterns
-        for pattern in whatsapp_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return MessageType.WHATSAPP
+        if MessageType.WHATSAPP in literal_types or _WHATSAPP_RE.search(self.content):
+            return MessageType.WHATSAPP
 
         # Check for SMS patterns
-        for pattern in sms_patterns:
-            if re.search(pattern, content, re.IGNORECASE):
-                return MessageType.SMS
+        content = self.content
+        if MessageType.SMS in literal_types:
+            return MessageType.SMS
+        if len(content) >= 11 and content[0] == '+' and content[1:11].isdecimal():
+            return MessageType.SMS  # Phone number at start
+        if len(content) == 6 and content.isdecimal():
+            return MessageType.SMS  # OTP-like numbers
+        if _SMS_RE.search(content):
+            return MessageType.SMS
 
         # Default to SMS if no specific pattern is matched
         return MessageType.SMS
 
     def get_queue_name(self) -> str:
-        return f"{self.determine_type()}_{self.priority}_queue"
+        return _QUEUE_NAMES[(self.determine_type(), self.priority)]
 
     def get_message_info(self) -> Dict:
         msg_type = self.determine_type()
@@ -104,72 +203,113 @@ class Message(BaseModel):
             "content_preview": self.content[:50] + "..." if len(self.content) > 50 else self.content
         }
 
-# Pika connection setup
-def get_rabbitmq_channel():
+# aio-pika connection and channel pools, created in startup_event. Pooled
+# channels are held exclusively by one /publish/batch request each; single
+# publishes share SHARED_CHANNEL_COUNT channels instead
+CONNECTION_POOL_SIZE = 4
+CHANNEL_POOL_SIZE = 16
+SHARED_CHANNEL_COUNT = 4
+
+# Upper bounds for /publish/batch: messages per request, and publishes
+# awaiting a broker confirm at once on the batch's channel
+MAX_BATCH_SIZE = 500
+MAX_BATCH_IN_FLIGHT = 64
+
+async def get_connection() -> aio_pika.abc.AbstractRobustConnection:
+    return await aio_pika.connect_robust(
+        host=rabbitmq_host, login=rabbitmq_user, password=rabbitmq_pass
+    )
+
+async def get_channel() -> aio_pika.abc.AbstractChannel:
+    async with app.state.connection_pool.acquire() as connection:
+        # Confirms are awaited per publish, so concurrent publishes on one
+        # channel are pipelined and acknowledged by the broker as they land
+        return await connection.channel(publisher_confirms=True)
+
+async def get_shared_channel() -> aio_pika.abc.AbstractChannel:
+    # Confirms are matched by delivery tag, so any number of single publishes
+    # can await their acks on the same channel without holding it
+    channels = app.state.shared_channels
+    channel = channels[next(app.state.shared_channel_index) % len(channels)]
+    if channel.is_closed:
+        await channel.reopen()
+    return channel
+
+def encode_task_message(task_message: Dict) -> bytes:
     try:
-        credentials = pika.PlainCredentials(rabbitmq_user, rabbitmq_pass)
-        connection = pika.BlockingConnection(
-            pika.ConnectionParameters(host=rabbitmq_host, credentials=credentials)
-        )
-        channel = connection.channel()
-        # Declare queues for different message types
-        for queue in ["sms_queue", "email_queue", "whatsapp_queue"]:
-            channel.queue_declare(queue=queue, durable=True)
-        return channel
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"RabbitMQ connection error: {e}")
+        return orjson.dumps(task_message)
+    except orjson.JSONEncodeError:
+        # orjson rejects integers outside 64 bits, which client metadata may hold
+        return json.dumps(task_message).encode()
+
+async def publish_to_queue(channel: aio_pika.abc.AbstractChannel, message: Message) -> Dict:
+    message_type = message.determine_type()
+    routing_key = message.get_queue_name()
+    message_info = message.get_message_info()
+
+    task_message = {
+        "task": _TASK_NAMES[message_type],
+        "id": uuid.uuid4().hex,
+        "args": [{"content": message.content}],
+        "kwargs": {},
+        "timeout": message.timeout,
+        "priority": message.priority,
+        "metadata": message.metadata
+    }
+
+    await channel.default_exchange.publish(
+        aio_pika.Message(
+            body=encode_task_message(task_message),
+            expiration=message.timeout,
+            **_MESSAGE_PROPERTIES[message.priority]
+        ),
+        routing_key=routing_key,
+    )
+    logger.info("Published message: %s", message_info)
+    return {
+        "message": f"{message_type} message published successfully",
+        "queue": routing_key,
+        "info": message_info
+    }
 
 @app.post("/publish")
-def publish_message(message: Message):
+async def publish_message(message: Message):
     try:
-        message_type = message.determine_type()
-        queue_name = message.get_queue_name()
-        message_info = message.get_message_info()
-        
-        channel = get_rabbitmq_channel()
-        task_message = {
-            "task": f"process_{message_type}_message",
-            "id": str(uuid.uuid4()),
-            "args": [{"content": message.content}],
-            "kwargs": {},
-            "timeout": message.timeout,
-            "priority": message.priority,
-            "metadata": message.metadata
-        }
-
-        channel.basic_publish(
-            exchange="",
-            routing_key=queue_name,
-            body=json.dumps(task_message),
-            properties=pika.BasicProperties(
-                delivery_mode=2,
-                content_type="application/json",
-                content_encoding="utf-8",
-                expiration=str(message.timeout * 1000),
-                priority=get_priority_value(message.priority)
-            ),
-        )
-        logger.info(f"Published message: {message_info}")
-        return {
-            "message": f"{message_type} message published successfully",
-            "queue": queue_name,
-            "info": message_info
-        }
+        return await publish_to_queue(await get_shared_channel(), message)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to publish message: {e}")
-    finally:
-        if channel:
-            channel.close()
 
-def get_priority_value(priority: MessagePriority) -> int:
-    priority_map = {
-        MessagePriority.HIGH: 3,
-        MessagePriority.MEDIUM: 2,
-        MessagePriority.LOW: 1
+@app.post("/publish/batch")
+async def publish_batch(messages: Annotated[List[Message], Body(max_length=MAX_BATCH_SIZE)]):
+    in_flight = asyncio.Semaphore(MAX_BATCH_IN_FLIGHT)
+
+    async def publish_one(channel: aio_pika.abc.AbstractChannel, message: Message) -> Dict:
+        async with in_flight:
+            return await publish_to_queue(channel, message)
+
+    try:
+        async with app.state.channel_pool.acquire() as channel:
+            outcomes = await asyncio.gather(
+                *(publish_one(channel, message) for message in messages),
+                return_exceptions=True
+            )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to publish messages: {e}")
+
+    # Report every message individually so clients only retry the failed ones
+    results = []
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            results.append({"index": index, "status": "failed", "error": str(outcome)})
+        else:
+            results.append({"index": index, "status": "published", **outcome})
+    published = sum(1 for result in results if result["status"] == "published")
+    return {
+        "message": f"{published} of {len(results)} messages published successfully",
+        "results": results
     }
-    return priority_map.get(priority, 2)
 
 if __name__ == "__main__":
     logger.info("Starting FastAPI server...")
@@ -1,8 +1,19 @@
 import os
-from celery import Celery
+from celery import Celery, maybe_patch_concurrency
+
+# Worker pool: prefork sized to cores for CPU-bound work, gevent/eventlet with
+# high concurrency (e.g. 100) for I/O-bound work. Green pools must monkey-patch
+# before kombu and the rest of the stack are imported.
+worker_pool = os.getenv('CELERY_POOL', 'prefork')
+maybe_patch_concurrency(['-P', worker_pool])
+
+from celery.signals import after_setup_logger, worker_process_init, worker_process_shutdown, worker_ready
 from kombu import Queue, Exchange
-from datetime import datetime
-import json
+import atexit
+import logging
+import logging.handlers
+import queue
+import orjson
 import time
 from enum import Enum
 from typing import Dict
@@ -23,36 +34,90 @@ rabbitmq_user = os.getenv('RABBITMQ_USER', 'user')  # Use the same credentials a
 rabbitmq_pass = os.getenv('RABBITMQ_PASS', 'password')
 rabbitmq_host = os.getenv('RABBITMQ_HOST', 'rabbitmq')
 
+# Worker tuning: prefetch a few messages per process for throughput; for
+# long-running tasks (seconds or more) set CELERY_PREFETCH_MULTIPLIER=1
+prefetch_multiplier = int(os.getenv('CELERY_PREFETCH_MULTIPLIER', '4'))
+worker_concurrency = int(os.getenv('CELERY_CONCURRENCY', os.cpu_count() or 1))
+
+# Seconds of artificial processing time per message (0 disables); use a
+# gevent pool if this stands in for real blocking I/O
+simulated_latency = float(os.getenv('SIMULATE_LATENCY_SEC', '0'))
+
+# Logging: records propagate to the root logger that Celery configures from
+# --loglevel/--logfile. Once configured, its handlers are moved behind a
+# background listener so task code only enqueues records; formatting and
+# writes happen on the listener thread. LOG_LEVEL optionally overrides the
+# level for this module's logger only.
+logger = logging.getLogger('subscriber')
+if 'LOG_LEVEL' in os.environ:
+    logger.setLevel(os.environ['LOG_LEVEL'].upper())
+log_listener = None
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The queue is in-process, so the record is passed as-is instead of
+    # being formatted in the calling thread
+    def prepare(self, record):
+        return record
+
+def start_log_listener(root: logging.Logger, handlers):
+    global log_listener
+    log_listener = logging.handlers.QueueListener(
+        queue.SimpleQueue(), *handlers, respect_handler_level=True
+    )
+    root.handlers[:] = [DeferredQueueHandler(log_listener.queue)]
+    log_listener.start()
+
+def stop_log_listener():
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+atexit.register(stop_log_listener)
+
+@after_setup_logger.connect
+def queue_log_handlers(logger, **kwargs):
+    start_log_listener(logger, logger.handlers[:])
+
+@worker_process_init.connect
+def restart_log_listener(**kwargs):
+    # The listener thread does not survive the fork into prefork pool children
+    if log_listener is not None:
+        start_log_listener(logging.getLogger(), log_listener.handlers)
+
+@worker_process_shutdown.connect
+def drain_log_listener(**kwargs):
+    # Pool children exit through os._exit, which skips atexit handlers
+    stop_log_listener()
+
 # Broker URL
 broker_url = f'amqp://{rabbitmq_user}:{rabbitmq_pass}@{rabbitmq_host}:5672//'
 
 # Initialize Celery
 app = Celery('subscriber', broker=broker_url)
 
+# One queue per (type, priority) pair, named as the publisher routes them;
+# queue_name is duplicated in publisher-service/publisher.py, keep the two in sync
+def queue_name(msg_type: MessageType, priority: MessagePriority) -> str:
+    return f'{msg_type.value}_{priority.value}_queue'
+
+_DIRECT = Exchange('', type='direct')
+task_queues = tuple(
+    Queue(queue_name(t, p), _DIRECT, routing_key=queue_name(t, p))
+    for t in MessageType for p in MessagePriority
+)
+
 # Configure Celery
 app.conf.update(
     task_serializer='json',  # Use JSON to handle structured data
     accept_content=['json'],  # Accept only JSON
     result_serializer='json',
-    task_queues=(
-        # SMS queues with priorities
-        Queue(f'sms_{MessagePriority.HIGH}_queue', Exchange('', type='direct'), routing_key=f'sms_{MessagePriority.HIGH}_queue'),
-        Queue(f'sms_{MessagePriority.MEDIUM}_queue', Exchange('', type='direct'), routing_key=f'sms_{MessagePriority.MEDIUM}_queue'),
-        Queue(f'sms_{MessagePriority.LOW}_queue', Exchange('', type='direct'), routing_key=f'sms_{MessagePriority.LOW}_queue'),
-        
-        # Email queues with priorities
-        Queue(f'email_{MessagePriority.HIGH}_queue', Exchange('', type='direct'), routing_key=f'email_{MessagePriority.HIGH}_queue'),
-        Queue(f'email_{MessagePriority.MEDIUM}_queue', Exchange('', type='direct'), routing_key=f'email_{MessagePriority.MEDIUM}_queue'),
-        Queue(f'email_{MessagePriority.LOW}_queue', Exchange('', type='direct'), routing_key=f'email_{MessagePriority.LOW}_queue'),
-        
-        # WhatsApp queues with priorities
-        Queue(f'whatsapp_{MessagePriority.HIGH}_queue', Exchange('', type='direct'), routing_key=f'whatsapp_{MessagePriority.HIGH}_queue'),
-        Queue(f'whatsapp_{MessagePriority.MEDIUM}_queue', Exchange('', type='direct'), routing_key=f'whatsapp_{MessagePriority.MEDIUM}_queue'),
-        Queue(f'whatsapp_{MessagePriority.LOW}_queue', Exchange('', type='direct'), routing_key=f'whatsapp_{MessagePriority.LOW}_queue'),
-    ),
-    task_default_queue=f'sms_{MessagePriority.MEDIUM}_queue',  # Default queue
+    task_queues=task_queues,
+    task_default_queue=queue_name(MessageType.SMS, MessagePriority.MEDIUM),  # Default queue
     broker_connection_retry_on_startup=True,
-    worker_prefetch_multiplier=1,
+    worker_pool=worker_pool,
+    worker_concurrency=worker_concurrency,
+    worker_prefetch_multiplier=prefetch_multiplier,
     broker_heartbeat=60,  # Set heartbeat to keep the connection alive
     task_acks_late=True,  # Enable late acknowledgment
     task_reject_on_worker_lost=True  # Reject task if worker is lost
@@ -61,22 +126,13 @@ app.conf.update(
 def process_message_with_timeout(func):
     def wrapper(self, body):
         try:
-            message = body if isinstance(body, dict) else json.loads(body)
+            message = body if isinstance(body, dict) else orjson.loads(body)
             timeout = message.get('timeout', 30)
             start_time = time.time()
             
-            # Log received message
-            print(f"\n{'='*50}")
-            print(f"Received message at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"Priority: {message.get('priority', 'MEDIUM')}")
-            print(f"Timeout: {timeout} seconds")
-            print(f"Retry Count: {message.get('retry_count', 3)}")
-            if 'metadata' in message:
-                print(f"Metadata: {message['metadata']}")
-            
-            # Simulate processing based on priority
-            process_time = 2 if message.get('priority') == 'HIGH' else 4
-            time.sleep(process_time)
+            # Optional simulated processing latency, off by default
+            if simulated_latency > 0:
+                time.sleep(simulated_latency)
             
             # Check timeout
             if time.time() - start_time > timeout:
@@ -85,14 +141,17 @@ def process_message_with_timeout(func):
             # Process the message
             result = func(self, message)
             
-            # Log completion
-            print(f"Processing completed in {time.time() - start_time:.2f} seconds")
-            print(f"{'='*50}\n")
+            # One record per processed message
+            logger.info(
+                "Processed %s message in %.2fs priority=%s timeout=%ss retry_count=%s metadata=%s content=%s",
+                result.get('type'), time.time() - start_time, message.get('priority', 'MEDIUM'),
+                timeout, message.get('retry_count', 3), message.get('metadata'),
+                message.get('args', [{}])[0].get('content', '')
+            )
             
             return result
         except Exception as e:
-            print(f"Error processing message: {e}")
-            print(f"Raw body: {body}")
+            logger.error("Error processing message: %s; raw body: %r", e, body)
             raise
     return wrapper
 
@@ -100,32 +159,24 @@ def process_message_with_timeout(func):
 @process_message_with_timeout
 def process_sms_message(self, message):
     """Process SMS message"""
-    args = message.get('args', [{}])[0]
-    content = args.get('content', '')
-    print(f"\nProcessing SMS Message:")
-    print(f"Content: {content}")
     return {"status": "success", "type": "sms"}
 
 @app.task(name='process_email_message', bind=True)
 @process_message_with_timeout
 def process_email_message(self, message):
     """Process Email message"""
-    args = message.get('args', [{}])[0]
-    content = args.get('content', '')
-    print(f"\nProcessing Email Message:")
-    print(f"Content: {content}")
     return {"status": "success", "type": "email"}
 
 @app.task(name='process_whatsapp_message', bind=True)
 @process_message_with_timeout
 def process_whatsapp_message(self, message):
     """Process WhatsApp message"""
-    args = message.get('args', [{}])[0]
-    content = args.get('content', '')
-    print(f"\nProcessing WhatsApp Message:")
-    print(f"Content: {content}")
     return {"status": "success", "type": "whatsapp"}
 
+@worker_ready.connect
+def log_worker_ready(**kwargs):
+    # Logged once Celery has configured logging; earlier INFO records are dropped
+    logger.info("Celery worker consuming from RabbitMQ at %s", rabbitmq_host)
+
 if __name__ == '__main__':
-    print(f"Starting Celery worker for RabbitMQ at {rabbitmq_host}")
-    app.worker_main(['worker', '--loglevel=INFO'])
+    app.worker_main(['worker', '-Ofair', '--loglevel=INFO'])